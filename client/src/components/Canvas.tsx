@@ -59,6 +59,9 @@ export default function Canvas({ boardId }: CanvasProps) {
     }, [cursors, dispatch]);
 
     const socketRef = useRef<WebSocket | null>(null);
+    // Bumped to reopen the socket when the server asks us to reconnect
+    const [connectionEpoch, setConnectionEpoch] = useState(0);
+    const reconnectTargetRef = useRef<string | null>(null);
     const isRemoteUpdate = useRef(false);
     const clientId = useRef(uuidv4()).current;
 
@@ -262,9 +265,11 @@ export default function Canvas({ boardId }: CanvasProps) {
         if (!fabricCanvas) return;
 
         // Convert HTTP URL to WebSocket URL
-        const wsUrl = API_BASE_URL.replace('https://', 'wss://').replace('http://', 'ws://');
+        const baseUrl = reconnectTargetRef.current || API_BASE_URL;
+        const wsUrl = baseUrl.replace('https://', 'wss://').replace('http://', 'ws://');
         const ws = new WebSocket(`${wsUrl}/api/ws/${boardId}`);
         socketRef.current = ws;
+        let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
 
         const sendCursorMove = throttle((data: any) => {
             if (ws.readyState === WebSocket.OPEN) {
@@ -291,6 +296,14 @@ export default function Canvas({ boardId }: CanvasProps) {
             try {
                 const msg = JSON.parse(event.data);
 
+                if (msg.type === 'reconnect') {
+                    // Server is draining: wait the (jittered) delay it chose, then reconnect
+                    if (msg.target) reconnectTargetRef.current = msg.target;
+                    clearTimeout(reconnectTimer);
+                    reconnectTimer = setTimeout(() => setConnectionEpoch(e => e + 1), msg.delay_ms ?? 1000);
+                    return;
+                }
+
                 if (msg.type === 'history') {
                     handleHistory(msg.data);
                     return;
@@ -322,6 +335,8 @@ export default function Canvas({ boardId }: CanvasProps) {
             if (!Array.isArray(historyItems)) return;
             isRemoteUpdate.current = true;
             fabric.util.enlivenObjects(historyItems, (objs: any[]) => {
+                // History is the full board state; replace what a previous connection drew
+                fabricCanvas.remove(...fabricCanvas.getObjects());
                 objs.forEach((obj) => fabricCanvas.add(obj));
                 fabricCanvas.requestRenderAll();
             }, "");
@@ -416,6 +431,7 @@ export default function Canvas({ boardId }: CanvasProps) {
 
         return () => {
             // clean up socket
+            clearTimeout(reconnectTimer);
             if (socketRef.current) socketRef.current.close();
             sendCursorMove.cancel();
             fabricCanvas.off('path:created', handlePathCreated);
@@ -423,7 +439,7 @@ export default function Canvas({ boardId }: CanvasProps) {
             fabricCanvas.off('object:modified', handleObjectModified);
             fabricCanvas.off('mouse:move', handleMouseMove);
         };
-    }, [fabricCanvas, boardId, tool]);
+    }, [fabricCanvas, boardId, tool, connectionEpoch]);
 
     // Cleanup old cursors
     useEffect(() => {
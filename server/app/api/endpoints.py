@@ -1,14 +1,26 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, Request, Header, Depends
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 from app.services.socket_manager import manager
+from app.services.board_cache import board_cache
+from app.services.board_io import export_boards, import_boards
+from app.services.summaries import init_summary, to_summary
 from app.db.redis import redis_client
 from app.db.mongodb import mongodb
-from app.models.board import Board
-from app.realtime.pipelines import persist_queue
+from app.models.board import Board, BoardSummary, BoardSummaryPage
+from app.realtime.pipelines import persist_queue, history_admission
+from app.core.config import settings
+from datetime import datetime
 import uuid
 import json
 
 router = APIRouter()
 
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Admin endpoints are disabled unless ADMIN_TOKEN is configured
+    if not settings.ADMIN_TOKEN or x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
 @router.post("/boards", response_model=Board)
 async def create_board():
     board_id = str(uuid.uuid4())[:8] # Short hash-like for friendly URL
@@ -16,8 +28,62 @@ async def create_board():
     
     # Save to Mongo
     await mongodb.db.boards.insert_one(new_board.model_dump())
+    await init_summary(board_id, new_board.created_at)
     return new_board
 
+@router.get("/boards", response_model=BoardSummaryPage)
+async def list_boards(limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    """
+    Lists board summaries, most recently active first.
+    Pass `next_cursor` from the previous page as `cursor` to continue.
+    """
+    query = {}
+    if cursor:
+        try:
+            ts, last_id = cursor.split("|", 1)
+            last_modified = datetime.fromisoformat(ts)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$or": [
+            {"last_modified": {"$lt": last_modified}},
+            {"last_modified": last_modified, "board_id": {"$lt": last_id}}
+        ]}
+
+    docs = await mongodb.db.board_summaries.find(query) \
+        .sort([("last_modified", -1), ("board_id", -1)]) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = f"{last['last_modified'].isoformat()}|{last['board_id']}"
+
+    return {"items": [to_summary(doc) for doc in docs], "next_cursor": next_cursor}
+
+# Declared before /boards/{board_id} so "export" is not taken as an id
+@router.get("/boards/export", dependencies=[Depends(require_admin)])
+async def export_boards_ndjson(board_id: Optional[List[str]] = Query(None)):
+    """
+    Streams the given boards (or all boards) as gzip-compressed NDJSON.
+    """
+    return StreamingResponse(
+        export_boards(board_id),
+        media_type="application/gzip",
+        headers={"Content-Disposition": 'attachment; filename="boards.ndjson.gz"'}
+    )
+
+@router.post("/boards/import", dependencies=[Depends(require_admin)])
+async def import_boards_ndjson(request: Request, replace: bool = False):
+    """
+    Imports an NDJSON export (gzip or plain) streamed in the request body.
+    """
+    try:
+        return await import_boards(request.stream(), replace=replace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/boards/{board_id}", response_model=Board)
 async def get_board(board_id: str):
     board = await mongodb.db.boards.find_one({"board_id": board_id})
@@ -25,35 +91,61 @@ async def get_board(board_id: str):
         raise HTTPException(status_code=404, detail="Board not found")
     return board
 
+@router.get("/boards/{board_id}/summary", response_model=BoardSummary)
+async def get_board_summary(board_id: str):
+    summary = await mongodb.db.board_summaries.find_one({"board_id": board_id})
+    if not summary:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return to_summary(summary)
+
+@router.get("/stats/boards")
+async def get_board_stats():
+    return board_cache.stats()
+
+@router.post("/admin/drain", dependencies=[Depends(require_admin)])
+async def drain_connections():
+    """
+    Pre-stop hook: redirects this node's clients before the server stops.
+    """
+    await manager.drain()
+    return {"status": "drained"}
+
+@router.delete("/admin/drain", dependencies=[Depends(require_admin)])
+async def undrain_connections():
+    """
+    Cancels a drain so the node accepts joins again.
+    """
+    manager.undrain()
+    return {"status": "accepting"}
+
 @router.websocket("/ws/{board_id}")
 async def websocket_endpoint(websocket: WebSocket, board_id: str):
     await manager.connect(websocket, board_id)
+
+    # Node is shutting down: send the client elsewhere before loading anything
+    if manager.draining:
+        await manager.send_reconnect(websocket, board_id)
+        return
     
-    # Send initial history from MongoDB
+    # Publishes this node's live count in the board summary (persistence worker)
+    await persist_queue.put({"board_id": board_id, "presence": True})
+
+    # Send initial history (from the board cache, falling back to MongoDB).
+    # Joins queue here so a reconnect storm cannot load every board at once;
+    # the slot covers load + serialization only, so slow clients can't hold it.
     try:
-        board = await mongodb.db.boards.find_one({"board_id": board_id})
-        if board and "snapshot" in board:
-            snapshot = board["snapshot"]
-            dirty = False
-            
-            # Migration: Ensure all objects have IDs
-            for item in snapshot:
-                if not item.get("id"):
-                    item["id"] = str(uuid.uuid4())
-                    dirty = True
-            
-            if dirty:
-                await mongodb.db.boards.update_one(
-                    {"board_id": board_id},
-                    {"$set": {"snapshot": snapshot}}
-                )
-            
-            # Send history as a batch
-            history_msg = {
-                "type": "history",
-                "data": snapshot
-            }
-            await websocket.send_text(json.dumps(history_msg))
+        history_text = None
+        async with history_admission:
+            snapshot = await board_cache.get_snapshot(board_id)
+            if snapshot is not None:
+                # Send history as a batch
+                history_msg = {
+                    "type": "history",
+                    "data": snapshot
+                }
+                history_text = json.dumps(history_msg)
+        if history_text is not None:
+            await websocket.send_text(history_text)
     except Exception as e:
         print(f"Error fetching/migrating history: {e}")
 
@@ -77,5 +169,8 @@ async def websocket_endpoint(websocket: WebSocket, board_id: str):
             except Exception as e:
                 print(f"Error queueing persistence events: {e}")
             
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: socket was already closed server-side (e.g. while draining)
         manager.disconnect(websocket, board_id)
+    finally:
+        await persist_queue.put({"board_id": board_id, "presence": True})
@@ -0,0 +1,94 @@
+"""
+Command line tools for board maintenance.
+
+Run from the server directory:
+
+    python -m app.cli export [-o boards.ndjson.gz] [board_id ...]
+    python -m app.cli import boards.ndjson.gz [--replace]
+    python -m app.cli summaries
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+
+from app.db.mongodb import mongodb
+from app.db.redis import redis_client
+from app.services.board_io import export_boards, import_boards
+from app.services.summaries import ensure_summary_indexes, rebuild_all_summaries
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def _read_chunks(f):
+    while True:
+        chunk = f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def run_export(args):
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async for chunk in export_boards(args.board_ids or None):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+async def run_import(args):
+    f = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    try:
+        stats = await import_boards(_read_chunks(f), replace=args.replace)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+    print(json.dumps(stats), file=sys.stderr)
+
+
+async def run_summaries(args):
+    await ensure_summary_indexes()
+    count = await rebuild_all_summaries()
+    print(json.dumps({"summaries": count}), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Export boards as gzip-compressed NDJSON")
+    p_export.add_argument("board_ids", nargs="*", help="Boards to export (default: all)")
+    p_export.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    p_export.set_defaults(func=run_export)
+
+    p_import = sub.add_parser("import", help="Import boards from an NDJSON export")
+    p_import.add_argument("input", help="Input file, gzip or plain NDJSON ('-' for stdin)")
+    p_import.add_argument("--replace", action="store_true", help="Overwrite boards that already exist")
+    p_import.set_defaults(func=run_import)
+
+    p_summaries = sub.add_parser("summaries", help="Rebuild summaries and previews for all boards")
+    p_summaries.set_defaults(func=run_summaries)
+
+    args = parser.parse_args()
+
+    async def run():
+        # Keep connection chatter off stdout, which may carry the export
+        with contextlib.redirect_stdout(sys.stderr):
+            mongodb.connect()
+        # Imports publish cache invalidations to the running servers
+        await redis_client.connect()
+        try:
+            await args.func(args)
+        finally:
+            with contextlib.redirect_stdout(sys.stderr):
+                mongodb.close()
+            await redis_client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,22 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "supersecretkey"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Process-wide budget for cached board state (resident + hibernated)
+    BOARD_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    # Share of the budget hibernated (compressed) boards may occupy
+    BOARD_CACHE_HIBERNATE_RATIO: float = 0.25
+    # Max joins loading/sending history at once on this node
+    MAX_CONCURRENT_HISTORY_LOADS: int = 8
+    # Reconnect directive sent while draining: base delay + random jitter
+    RECONNECT_BASE_DELAY_MS: int = 500
+    RECONNECT_JITTER_MS: int = 5000
+    # Preferred reconnect URL (e.g. the load balancer); empty = same URL
+    RECONNECT_TARGET: str = ""
+    # Sockets closed per step while draining, and pause between steps
+    DRAIN_BATCH_SIZE: int = 50
+    DRAIN_INTERVAL: float = 0.2
+    # Token (X-Admin-Token) for admin endpoints: drain, board export/import; empty disables them
+    ADMIN_TOKEN: str = ""
 
     class Config:
         env_file = ".env"
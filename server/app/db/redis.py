@@ -10,11 +10,11 @@ class MockPubSub:
         self.queue = asyncio.Queue()
         self.subscribed_patterns = []
 
-    async def psubscribe(self, pattern):
-        self.subscribed_patterns.append(pattern)
+    async def psubscribe(self, *patterns):
+        self.subscribed_patterns.extend(patterns)
         # Register this pubsub to the mock redis
         self.mock_redis.add_subscriber(self)
-        logging.info(f"MockPubSub subscribed to {pattern}")
+        logging.info(f"MockPubSub subscribed to {', '.join(patterns)}")
 
     async def listen(self):
         while True:
@@ -30,7 +30,8 @@ class MockRedis:
         self.subscribers = []
 
     def add_subscriber(self, pubsub):
-        self.subscribers.append(pubsub)
+        if pubsub not in self.subscribers:
+            self.subscribers.append(pubsub)
 
     def remove_subscriber(self, pubsub):
         if pubsub in self.subscribers:
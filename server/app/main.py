@@ -9,32 +9,43 @@ from app.core.config import settings
 from app.db.mongodb import mongodb
 from app.db.redis import redis_client
 from app.services.redis_listener import listen_to_redis
-from app.services.persistence import mongo_persistence_worker
+from app.services.persistence import mongo_persistence_worker, shutdown_event
+from app.services.socket_manager import manager
+from app.services.summaries import ensure_summary_indexes, summary_preview_worker, presence_heartbeat_worker
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     mongodb.connect()
     await redis_client.connect()
+    await ensure_summary_indexes()
     
     # Start Redis Listener and Cleanup in background
     from app.services.cleanup import cleanup_empty_rooms
     task = asyncio.create_task(listen_to_redis())
     cleanup_task = asyncio.create_task(cleanup_empty_rooms())
     persistence_task = asyncio.create_task(mongo_persistence_worker())
+    preview_task = asyncio.create_task(summary_preview_worker())
+    presence_task = asyncio.create_task(presence_heartbeat_worker())
     
     yield
     
     # Shutdown
+    # Hand clients off gradually (jittered reconnect) instead of dropping them all at once
+    await manager.drain()
+
     task.cancel()
     cleanup_task.cancel()
-    persistence_task.cancel()
+    preview_task.cancel()
+    presence_task.cancel()
+    await asyncio.gather(task, cleanup_task, preview_task, presence_task, return_exceptions=True)
+
+    # Let the persistence worker drain its queue and flush before Mongo goes away
+    shutdown_event.set()
     try:
-        await task
-        await cleanup_task
-        await persistence_task
-    except asyncio.CancelledError:
-        pass
+        await asyncio.wait_for(persistence_task, timeout=10)
+    except asyncio.TimeoutError:
+        print("Persistence worker did not stop in time")
         
     mongodb.close()
     await redis_client.close()
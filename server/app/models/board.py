@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 class DrawingEvent(BaseModel):
@@ -16,3 +16,15 @@ class Board(BaseModel):
     owner_id: str = "anon"
     created_at: datetime = Field(default_factory=datetime.utcnow)
     snapshot: List[DrawingEvent] = []
+
+class BoardSummary(BaseModel):
+    board_id: str
+    object_count: int = 0
+    bbox: Optional[Dict[str, float]] = None
+    last_modified: Optional[datetime] = None
+    participant_count: int = 0
+    preview_svg: Optional[str] = None
+
+class BoardSummaryPage(BaseModel):
+    items: List[BoardSummary]
+    next_cursor: Optional[str] = None
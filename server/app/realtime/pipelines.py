@@ -1,3 +1,20 @@
 import asyncio
+from app.core.config import settings
 
 persist_queue = asyncio.Queue()
+
+# Admission control for joins: caps concurrent history loads per node
+history_admission = asyncio.Semaphore(settings.MAX_CONCURRENT_HISTORY_LOADS)
+
+# Event types that change board content (everything else, e.g. cursors, is ephemeral)
+PERSISTED_EVENT_TYPES = (
+    "object:added",
+    "object:modified",
+    "object:removed",
+    "board:clear",
+)
+
+# Server-only Redis channel telling every node to drop its cached copy of a
+# board (message data is the board_id). Kept off board:* so clients can
+# neither send nor receive it.
+INVALIDATE_CHANNEL = "cache:invalidate"
@@ -0,0 +1,368 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.mongodb import mongodb
+from app.db.redis import redis_client
+from app.realtime.pipelines import PERSISTED_EVENT_TYPES, INVALIDATE_CHANNEL
+from app.services.socket_manager import manager
+
+
+# Fan-out events are remembered this long (seconds) and replayed onto fresh
+# loads; must comfortably exceed the persistence worker's write lag
+RECENT_EVENTS_WINDOW = 10.0
+
+# Marker kept in the recent-events log when a board is invalidated
+INVALIDATE_EVENT = "board:invalidate"
+
+# Minimum seconds between "over budget" warnings
+BUDGET_WARNING_INTERVAL = 60.0
+
+
+def _sizeof(obj) -> int:
+    # Approximate footprint: serialized JSON length is cheap and tracks object size well enough
+    return len(json.dumps(obj, default=str))
+
+
+class BoardCache:
+    """
+    Process-wide cache of board snapshots with a memory budget.
+
+    Boards are kept "resident" (plain Python lists) while they are in use.
+    When the budget is exceeded, least-recently-active boards without local
+    connections are hibernated to a zlib-compressed JSON blob, and the oldest
+    hibernated boards are dropped entirely (MongoDB remains the source of truth).
+    A board wakes transparently on the next `get_snapshot`.
+
+    Resident snapshots are kept up to date from the Redis fan-out, which carries
+    events from every node, so joins on a warm board skip MongoDB.
+    """
+
+    def __init__(self, max_bytes: int, hibernate_ratio: float):
+        self.max_bytes = max_bytes
+        self.max_hibernated_bytes = int(max_bytes * hibernate_ratio)
+
+        # board_id -> snapshot, ordered least -> most recently active
+        self.resident: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self.resident_sizes: Dict[str, int] = {}
+        self.resident_bytes = 0
+
+        # board_id -> compressed snapshot, ordered oldest -> newest hibernation
+        self.hibernated: "OrderedDict[str, bytes]" = OrderedDict()
+        self.hibernated_bytes = 0
+
+        # board_id -> recent (monotonic time, event), boards ordered by last event
+        self.recent: "OrderedDict[str, deque]" = OrderedDict()
+
+        # board_id -> (in-flight Mongo load, monotonic start), shared by concurrent joins
+        self.loading: Dict[str, Tuple[asyncio.Task, float]] = {}
+
+        # manager.rooms_emptied as of the last budget scan that found no idle
+        # board; None once a board became resident since
+        self.no_idle_at: Optional[int] = None
+        self.last_budget_warning = 0.0
+
+        self.counters = {
+            "hits": 0,
+            "wakes": 0,
+            "loads": 0,
+            "hibernations": 0,
+            "drops": 0,
+        }
+
+    async def get_snapshot(self, board_id: str) -> Optional[List[dict]]:
+        """
+        Returns the board snapshot, waking or loading it if needed.
+        Returns None if the board does not exist.
+        """
+        if board_id in self.resident:
+            self.counters["hits"] += 1
+            self.resident.move_to_end(board_id)
+            return self.resident[board_id]
+
+        if board_id in self.hibernated:
+            self.counters["wakes"] += 1
+            blob = self.hibernated.pop(board_id)
+            self.hibernated_bytes -= len(blob)
+            snapshot = json.loads(zlib.decompress(blob))
+            self._make_resident(board_id, snapshot)
+            return snapshot
+
+        for _ in range(2):
+            # Single-flight: a burst of joins to a cold board costs one Mongo read
+            entry = self.loading.get(board_id)
+            if entry is None:
+                entry = (asyncio.ensure_future(self._load(board_id)), time.monotonic())
+                self.loading[board_id] = entry
+                entry[0].add_done_callback(lambda _, e=entry: self._load_done(board_id, e))
+            task, started = entry
+
+            snapshot = await asyncio.shield(task)
+            if snapshot is None:
+                return None
+
+            # Another join sharing the load may have made it resident already
+            if board_id in self.resident:
+                return self.resident[board_id]
+
+            if not self._invalidated_since(board_id, started):
+                break
+            # The board was replaced (e.g. imported) while loading: read it again
+        else:
+            # Replaced again during the reload; serve it but don't cache it
+            return snapshot
+
+        self.counters["loads"] += 1
+        self._make_resident(board_id, snapshot)
+
+        # Events published before they were persisted, or while the load was in
+        # flight, are missing from what Mongo returned
+        for msg in self._recent_events(board_id):
+            if board_id not in self.resident:
+                break
+            self._apply(board_id, msg, replay=True)
+
+        return snapshot
+
+    def _load_done(self, board_id: str, entry: tuple):
+        if self.loading.get(board_id) is entry:
+            del self.loading[board_id]
+
+    async def _load(self, board_id: str) -> Optional[List[dict]]:
+        board = await mongodb.db.boards.find_one(
+            {"board_id": board_id},
+            {"snapshot": 1}
+        )
+        if not board:
+            return None
+
+        snapshot = board.get("snapshot") or []
+        dirty = False
+
+        # Migration: Ensure all objects have IDs
+        for item in snapshot:
+            if not isinstance(item, dict):
+                continue
+            if not item.get("id"):
+                item["id"] = str(uuid.uuid4())
+                dirty = True
+
+        if dirty:
+            await mongodb.db.boards.update_one(
+                {"board_id": board_id},
+                {"$set": {"snapshot": snapshot}}
+            )
+
+        return snapshot
+
+    def apply_event(self, board_id: str, data_str: str):
+        """
+        Mirrors a persisted event onto the cached copy of a board, using the
+        same semantics as the Mongo persistence worker.
+        """
+        # Cheap pre-check so cursor traffic is not parsed
+        if "object:" not in data_str and "board:clear" not in data_str:
+            return
+
+        try:
+            msg = json.loads(data_str)
+        except Exception:
+            return
+
+        # Payloads come straight from clients; anything but an object is ignored
+        if not isinstance(msg, dict):
+            return
+
+        t = msg.get("type")
+        if t not in PERSISTED_EVENT_TYPES:
+            return
+        if t != "board:clear" and not isinstance(msg.get("data"), dict):
+            return
+
+        # Kept for every board, so a load that races this event can replay it
+        self._remember(board_id, msg)
+
+        if board_id in self.hibernated:
+            # Stale now; next join reloads from Mongo
+            self._drop_hibernated(board_id)
+            return
+
+        if board_id in self.resident:
+            self._apply(board_id, msg)
+
+    def _apply(self, board_id: str, msg: dict, replay: bool = False):
+        t = msg["type"]
+        data = msg.get("data")
+        snapshot = self.resident[board_id]
+        delta = 0
+
+        if t == "board:clear":
+            snapshot.clear()
+            delta = -self.resident_sizes[board_id]
+
+        else:
+            obj_id = data.get("id")
+            # On replay an add may already be in the loaded snapshot: treat it
+            # like a modify so the result (and order) matches Mongo
+            if t != "object:added" or (replay and obj_id):
+                if not obj_id:
+                    return
+                for i, item in enumerate(snapshot):
+                    if isinstance(item, dict) and item.get("id") == obj_id:
+                        delta -= _sizeof(snapshot.pop(i))
+                        break
+            # Added/modified objects go to the end, like $push (after $pull)
+            if t != "object:removed":
+                snapshot.append(data)
+                delta += _sizeof(data)
+
+        self.resident_sizes[board_id] += delta
+        self.resident_bytes += delta
+        self.resident.move_to_end(board_id)
+        self._enforce_budget()
+
+    def _remember(self, board_id: str, msg: dict):
+        now = time.monotonic()
+        events = self.recent.get(board_id)
+        if events is None:
+            events = self.recent[board_id] = deque()
+        else:
+            self.recent.move_to_end(board_id)
+        events.append((now, msg))
+
+        # Forget boards with no event inside the window (oldest first)
+        cutoff = now - RECENT_EVENTS_WINDOW
+        while self.recent:
+            oldest_id, oldest_events = next(iter(self.recent.items()))
+            if oldest_events[-1][0] >= cutoff:
+                break
+            del self.recent[oldest_id]
+        while events[0][0] < cutoff:
+            events.popleft()
+
+    def _recent_events(self, board_id: str) -> List[dict]:
+        cutoff = time.monotonic() - RECENT_EVENTS_WINDOW
+        events = []
+        for ts, msg in self.recent.get(board_id, ()):
+            if ts < cutoff:
+                continue
+            if msg["type"] == INVALIDATE_EVENT:
+                # Anything earlier belongs to the replaced board
+                events = []
+            else:
+                events.append(msg)
+        return events
+
+    def _invalidated_since(self, board_id: str, since: float) -> bool:
+        return any(
+            ts >= since and msg["type"] == INVALIDATE_EVENT
+            for ts, msg in self.recent.get(board_id, ())
+        )
+
+    async def invalidate(self, board_id: str):
+        """
+        Drops a board from the cache on every node, after its Mongo document
+        was rewritten outside the event stream (import, deletion).
+        """
+        self.discard(board_id)
+        if redis_client.redis:
+            await redis_client.redis.publish(INVALIDATE_CHANNEL, board_id)
+
+    def apply_invalidation(self, board_id: str):
+        """
+        Handles an INVALIDATE_CHANNEL message: the board was rewritten outside
+        the event stream, so the cached copy (and any load in flight) is stale.
+        """
+        self._remember(board_id, {"type": INVALIDATE_EVENT})
+        self.discard(board_id)
+
+    def discard(self, board_id: str):
+        if board_id in self.resident:
+            del self.resident[board_id]
+            self.resident_bytes -= self.resident_sizes.pop(board_id)
+        if board_id in self.hibernated:
+            self._drop_hibernated(board_id)
+
+    def stats(self) -> dict:
+        return {
+            "budget_bytes": self.max_bytes,
+            "resident_boards": len(self.resident),
+            "resident_bytes": self.resident_bytes,
+            "hibernated_boards": len(self.hibernated),
+            "hibernated_bytes": self.hibernated_bytes,
+            "connected_boards": len(manager.active_connections),
+            "empty_tracked_boards": len(manager.empty_since),
+            "recent_event_boards": len(self.recent),
+            **self.counters,
+        }
+
+    def _make_resident(self, board_id: str, snapshot: List[dict]):
+        size = _sizeof(snapshot)
+        self.resident[board_id] = snapshot
+        self.resident_sizes[board_id] = size
+        self.resident_bytes += size
+        self.no_idle_at = None
+        self._enforce_budget()
+
+    def _hibernate(self, board_id: str):
+        snapshot = self.resident.pop(board_id)
+        self.resident_bytes -= self.resident_sizes.pop(board_id)
+
+        blob = zlib.compress(json.dumps(snapshot, default=str).encode("utf-8"))
+        self.hibernated[board_id] = blob
+        self.hibernated_bytes += len(blob)
+        self.counters["hibernations"] += 1
+
+    def _drop_hibernated(self, board_id: str):
+        blob = self.hibernated.pop(board_id)
+        self.hibernated_bytes -= len(blob)
+        self.counters["drops"] += 1
+
+    def _enforce_budget(self):
+        # Skip the scan while nothing can have become idle since the last one
+        # found no idle board: runs on every event, so it must stay cheap
+        if (
+            self.resident_bytes + self.hibernated_bytes > self.max_bytes
+            and self.no_idle_at != manager.rooms_emptied
+        ):
+            # Least recently active first; boards with live sockets stay resident
+            idle = [
+                board_id for board_id in self.resident
+                if board_id not in manager.active_connections
+            ]
+            for board_id in idle:
+                if self.resident_bytes + self.hibernated_bytes <= self.max_bytes:
+                    break
+                self._hibernate(board_id)
+            if self.resident_bytes > self.max_bytes:
+                # Every idle board is hibernated; only live ones are left
+                self.no_idle_at = manager.rooms_emptied
+
+        while self.hibernated and (
+            self.hibernated_bytes > self.max_hibernated_bytes
+            or self.resident_bytes + self.hibernated_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self.hibernated))
+            self._drop_hibernated(oldest)
+
+        if self.resident_bytes > self.max_bytes:
+            now = time.monotonic()
+            if now - self.last_budget_warning < BUDGET_WARNING_INTERVAL:
+                return
+            self.last_budget_warning = now
+            logging.warning(
+                f"Board cache over budget with active boards only: "
+                f"{self.resident_bytes} > {self.max_bytes} bytes"
+            )
+
+
+board_cache = BoardCache(
+    max_bytes=settings.BOARD_CACHE_MAX_BYTES,
+    hibernate_ratio=settings.BOARD_CACHE_HIBERNATE_RATIO,
+)
@@ -0,0 +1,298 @@
+import json
+import uuid
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.db.mongodb import mongodb
+from app.services.board_cache import board_cache
+from app.services.summaries import mark_stale
+
+# Tunable parameters
+EXPORT_BATCH_SIZE = 500     # cursor batch size (unwound objects)
+EXPORT_CHUNK_SIZE = 64 * 1024  # uncompressed bytes per compressed chunk
+IMPORT_BATCH_SIZE = 500     # max boards / objects buffered before a write
+
+# NDJSON layout (one JSON object per line):
+#   {"kind": "board", "board_id": ..., "owner_id": ..., "created_at": ..., "last_modified": ...}
+#   {"kind": "object", "board_id": ..., "data": {...}}   (one per snapshot item)
+# Object lines always follow their board line.
+
+
+def _dump_line(doc: dict) -> bytes:
+    return json.dumps(doc, default=str, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+async def export_boards(board_ids: Optional[List[str]] = None) -> AsyncIterator[bytes]:
+    """
+    Streams boards as gzip-compressed NDJSON.
+
+    Snapshots are unwound server-side so the cursor yields one object at a
+    time, keeping memory flat no matter how large a single board is.
+    """
+    match = {"board_id": {"$in": board_ids}} if board_ids else {}
+    pipeline = [
+        {"$match": match},
+        # Carry the board's last activity time so imports keep listing order
+        {"$lookup": {
+            "from": "board_summaries",
+            "localField": "board_id",
+            "foreignField": "board_id",
+            "as": "summary"
+        }},
+        {"$project": {
+            "_id": 0, "board_id": 1, "owner_id": 1, "created_at": 1, "snapshot": 1,
+            "last_modified": {"$arrayElemAt": ["$summary.last_modified", 0]}
+        }},
+        # $unwind emits all items of a document consecutively, so boards stay grouped
+        {"$unwind": {"path": "$snapshot", "preserveNullAndEmptyArrays": True}},
+    ]
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    buf = bytearray()
+    current_board = None
+
+    cursor = mongodb.db.boards.aggregate(pipeline, batchSize=EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        board_id = doc["board_id"]
+        if board_id != current_board:
+            current_board = board_id
+            buf += _dump_line({
+                "kind": "board",
+                "board_id": board_id,
+                "owner_id": doc.get("owner_id", "anon"),
+                "created_at": _isoformat(doc.get("created_at")),
+                "last_modified": _isoformat(doc.get("last_modified")),
+            })
+
+        if "snapshot" in doc:
+            buf += _dump_line({"kind": "object", "board_id": board_id, "data": doc["snapshot"]})
+
+        if len(buf) >= EXPORT_CHUNK_SIZE:
+            chunk = compressor.compress(bytes(buf))
+            buf.clear()
+            if chunk:
+                yield chunk
+
+    chunk = compressor.compress(bytes(buf)) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+STAGING_PREFIX = "~import:"
+
+
+class _BoardImporter:
+    """
+    Buffers parsed NDJSON lines and writes them in bounded batches:
+    boards via insert_many, snapshot items via $push/$each.
+
+    Boards are written under a staging id and only renamed to their real id
+    (replacing any existing board) once all of their objects have landed, so
+    a truncated or failed upload never destroys or exposes a partial board.
+    """
+
+    def __init__(self, replace: bool):
+        self.replace = replace
+        self.nonce = uuid.uuid4().hex[:8]
+        self.boards: List[dict] = []                   # headers waiting for insert_many
+        self.objects: Dict[str, list] = defaultdict(list)
+        self.object_count = 0
+        self.staged: Dict[str, ObjectId] = {}          # board_id -> staged doc _id
+        self.activity: Dict[str, Optional[datetime]] = {}  # board_id -> exported last activity
+        self.current: Optional[str] = None             # board receiving object lines
+        self.complete: List[str] = []                  # boards ready to finalize
+        self.seen = set()
+        self.skipped = set()
+        self.stats = {"boards": 0, "objects": 0, "skipped_boards": 0, "bad_lines": 0}
+
+    def staging_id(self, board_id: str) -> str:
+        return f"{STAGING_PREFIX}{self.nonce}:{board_id}"
+
+    async def add_line(self, line: bytes):
+        line = line.strip()
+        if not line:
+            return
+
+        try:
+            doc = json.loads(line)
+            kind = doc["kind"]
+            board_id = doc["board_id"]
+        except Exception:
+            self.stats["bad_lines"] += 1
+            return
+
+        if not isinstance(board_id, str) or board_id.startswith(STAGING_PREFIX):
+            self.stats["bad_lines"] += 1
+            return
+
+        if kind == "board":
+            if board_id in self.seen:
+                # A repeated board line ends the current board too, and its
+                # objects are dropped rather than merged into the first copy
+                if self.current:
+                    self.complete.append(self.current)
+                self.current = None
+                self.stats["bad_lines"] += 1
+                return
+            self.seen.add(board_id)
+
+            # Object lines always follow their board line, so the previous board is done
+            if self.current:
+                self.complete.append(self.current)
+            self.current = board_id
+
+            created_at = _parse_datetime(doc.get("created_at"))
+            self.activity[board_id] = _parse_datetime(doc.get("last_modified")) or created_at
+            self.boards.append({
+                "board_id": board_id,
+                "owner_id": doc.get("owner_id", "anon"),
+                "created_at": created_at or datetime.utcnow(),
+                "snapshot": [],
+            })
+        elif kind == "object":
+            data = doc.get("data")
+            # Snapshot items are Fabric objects; anything else would break joins
+            if not isinstance(data, dict):
+                self.stats["bad_lines"] += 1
+                return
+            if board_id != self.current or board_id in self.skipped:
+                return
+            self.objects[board_id].append(data)
+            self.object_count += 1
+        else:
+            self.stats["bad_lines"] += 1
+            return
+
+        if len(self.boards) >= IMPORT_BATCH_SIZE or self.object_count >= IMPORT_BATCH_SIZE:
+            await self.flush()
+
+    async def finish(self):
+        if self.current:
+            self.complete.append(self.current)
+            self.current = None
+        await self.flush()
+
+    async def flush(self):
+        # Boards first, so the objects that follow have a document to land in
+        if self.boards:
+            if not self.replace:
+                ids = [b["board_id"] for b in self.boards]
+                existing = set()
+                async for doc in mongodb.db.boards.find({"board_id": {"$in": ids}}, {"board_id": 1}):
+                    existing.add(doc["board_id"])
+                if existing:
+                    self.skipped.update(existing)
+                    self.stats["skipped_boards"] += len(existing)
+                    self.boards = [b for b in self.boards if b["board_id"] not in existing]
+                    for board_id in existing:
+                        self.activity.pop(board_id, None)
+
+            if self.boards:
+                docs = [{**b, "board_id": self.staging_id(b["board_id"])} for b in self.boards]
+                result = await mongodb.db.boards.insert_many(docs, ordered=True)
+                for b, _id in zip(self.boards, result.inserted_ids):
+                    self.staged[b["board_id"]] = _id
+            self.boards = []
+
+        if self.objects:
+            targets = [board_id for board_id in self.objects if board_id in self.staged]
+            bulk_ops = [
+                UpdateOne({"_id": self.staged[board_id]}, {"$push": {"snapshot": {"$each": self.objects[board_id]}}})
+                for board_id in targets
+            ]
+            if bulk_ops:
+                await mongodb.db.boards.bulk_write(bulk_ops, ordered=True)
+            self.stats["objects"] += sum(len(self.objects[board_id]) for board_id in targets)
+            self.objects = defaultdict(list)
+            self.object_count = 0
+
+        await self._finalize()
+
+    async def _finalize(self):
+        done = [board_id for board_id in self.complete if board_id in self.staged]
+        self.complete = []
+        if not done:
+            return
+
+        staged_ids = [self.staged[board_id] for board_id in done]
+        await mongodb.db.boards.bulk_write([
+            UpdateOne({"_id": self.staged[board_id]}, {"$set": {"board_id": board_id}})
+            for board_id in done
+        ], ordered=False)
+        if self.replace:
+            # Old versions go only after their replacement is in place
+            await mongodb.db.boards.delete_many({
+                "board_id": {"$in": done},
+                "_id": {"$nin": staged_ids}
+            })
+
+        for board_id in done:
+            del self.staged[board_id]
+            await board_cache.invalidate(board_id)
+        await mark_stale({board_id: self.activity.pop(board_id, None) for board_id in done})
+        self.stats["boards"] += len(done)
+
+    async def abort(self):
+        if self.staged:
+            await mongodb.db.boards.delete_many({"_id": {"$in": list(self.staged.values())}})
+            self.staged = {}
+
+
+async def import_boards(chunks: AsyncIterator[bytes], replace: bool = False) -> dict:
+    """
+    Imports a gzip-compressed (or plain) NDJSON stream produced by `export_boards`.
+
+    Existing boards are skipped unless `replace` is set, in which case they
+    are overwritten. Raises ValueError on a truncated gzip stream; boards not
+    yet complete at that point are discarded. Returns import counters.
+    """
+    decompressor = zlib.decompressobj(47)  # wbits=47 -> auto-detect gzip/zlib
+    importer = _BoardImporter(replace)
+    pending = b""
+    first = True
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if first:
+                first = False
+                if chunk[:2] != b"\x1f\x8b":
+                    decompressor = None  # uncompressed NDJSON
+
+            pending += decompressor.decompress(chunk) if decompressor else chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                await importer.add_line(line)
+
+        if decompressor and not first:
+            pending += decompressor.flush()
+            if not decompressor.eof:
+                raise ValueError("Truncated gzip stream")
+        for line in pending.split(b"\n"):
+            await importer.add_line(line)
+
+        await importer.finish()
+    except BaseException:
+        await importer.abort()
+        raise
+
+    return importer.stats
@@ -3,6 +3,8 @@ import asyncio
 import time
 import logging
 from app.services.socket_manager import manager
+from app.services.board_cache import board_cache
+from app.services.summaries import delete_summary
 from app.db.mongodb import mongodb
 
 async def cleanup_empty_rooms():
@@ -27,6 +29,7 @@ async def cleanup_empty_rooms():
                         # Already gone, just clean up memory
                         if board_id in manager.empty_since:
                             del manager.empty_since[board_id]
+                        board_cache.discard(board_id)
                         continue
                     
                     # Logic: "Room is black" -> Empty snapshot
@@ -34,6 +37,8 @@ async def cleanup_empty_rooms():
                     if not snapshot or len(snapshot) == 0:
                         logging.info(f"Removing inactive empty room: {board_id}")
                         await mongodb.db.boards.delete_one({"board_id": board_id})
+                        await delete_summary(board_id)
+                        await board_cache.invalidate(board_id)
                     
                     # Either way, if it's been empty for 5 minutes, we stop tracking it 
                     # (if we didn't delete it, it stays in DB but we don't need to check repeatedly until someone joins/leaves again? 
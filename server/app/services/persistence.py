@@ -1,14 +1,18 @@
 import asyncio
 import json
 from collections import defaultdict
-from app.realtime.pipelines import persist_queue
+from app.realtime.pipelines import persist_queue, PERSISTED_EVENT_TYPES
 from app.db.mongodb import mongodb
+from app.services.summaries import apply_events_to_summary
 from pymongo import UpdateOne
 
 # Tunable parameters
 BATCH_SIZE = 50          # max events per batch
 FLUSH_INTERVAL = 0.5    # seconds
 
+# Set during shutdown: the worker drains persist_queue, flushes and exits
+shutdown_event = asyncio.Event()
+
 async def apply_events_to_board(board_id: str, events: list):
     """
     Apply a batch of events to one board snapshot in MongoDB.
@@ -57,6 +61,12 @@ async def apply_events_to_board(board_id: str, events: list):
                 {"$set": {"snapshot": []}}
             ))
 
+    # Summary first: its version bump invalidates any rebuild racing this write
+    try:
+        await apply_events_to_summary(board_id, events)
+    except Exception as e:
+        print(f"Summary update failed for board {board_id}: {e}")
+
     # Execute bulk write
     if bulk_ops:
         try:
@@ -82,6 +92,27 @@ async def flush_buffer(buffer):
         except Exception as e:
             print(f"Mongo write failed for board {board_id}:", e)
 
+def buffer_item(buffer, item):
+    board_id = item["board_id"]
+
+    # Server-generated join/leave, only ever reflected in the board summary
+    if "presence" in item:
+        buffer.append((board_id, {"type": "presence"}))
+        return
+
+    data_str = item["data"]
+
+    try:
+        msg = json.loads(data_str)
+        msg_type = msg.get("type")
+
+        # Only persist stable events
+        if msg_type in PERSISTED_EVENT_TYPES:
+            buffer.append((board_id, msg))
+
+    except Exception as e:
+        print("Bad persistence message:", e)
+
 async def mongo_persistence_worker():
     """
     Background worker that:
@@ -96,7 +127,7 @@ async def mongo_persistence_worker():
 
     print("Mongo persistence worker started")
 
-    while True:
+    while not shutdown_event.is_set():
         try:
              # Wait for next item with timeout so we can flush if idle
             try:
@@ -120,24 +151,7 @@ async def mongo_persistence_worker():
 
                 item = await asyncio.wait_for(persist_queue.get(), timeout=timeout)
                 
-                board_id = item["board_id"]
-                data_str = item["data"]
-
-                try:
-                    msg = json.loads(data_str)
-                    msg_type = msg.get("type")
-
-                    # Only persist stable events
-                    if msg_type in [
-                        "object:added",
-                        "object:modified",
-                        "object:removed",
-                        "board:clear"
-                    ]:
-                        buffer.append((board_id, msg))
-
-                except Exception as e:
-                    print("Bad persistence message:", e)
+                buffer_item(buffer, item)
 
             except asyncio.TimeoutError:
                 # Timeout reached, time to flush if we have anything
@@ -159,3 +173,10 @@ async def mongo_persistence_worker():
         except Exception as e:
              print(f"Worker loop error: {e}")
              await asyncio.sleep(1) # Prevent tight loop on error
+
+    # Graceful shutdown: persist everything that was accepted before exiting
+    while not persist_queue.empty():
+        buffer_item(buffer, persist_queue.get_nowait())
+    await flush_buffer(buffer)
+    buffer.clear()
+    print("Mongo persistence worker stopped")
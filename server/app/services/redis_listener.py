@@ -2,6 +2,8 @@ import asyncio
 import logging
 from app.db.redis import redis_client
 from app.services.socket_manager import manager
+from app.services.board_cache import board_cache
+from app.realtime.pipelines import INVALIDATE_CHANNEL
 
 async def listen_to_redis():
    
@@ -10,17 +12,29 @@ async def listen_to_redis():
         return
 
     pubsub = redis_client.redis.pubsub()
-    await pubsub.psubscribe("board:*")
-    logging.info("Subscribed to Redis board:* channels")
+    await pubsub.psubscribe("board:*", INVALIDATE_CHANNEL)
+    logging.info(f"Subscribed to Redis board:* and {INVALIDATE_CHANNEL} channels")
     
     try:
         async for message in pubsub.listen():
             if message["type"] == "pmessage":
                 channel = message["channel"]
+                if channel == INVALIDATE_CHANNEL:
+                    # Server-only; never relayed to clients
+                    try:
+                        board_cache.apply_invalidation(message["data"])
+                    except Exception as e:
+                        logging.error(f"Board cache invalidation error: {e}")
+                    continue
                 # Channel format: board:{board_id}
                 if ":" in channel:
                     board_id = channel.split(":")[1]
                     data = message["data"]
+                    # A cache error must never stop the fan-out
+                    try:
+                        board_cache.apply_event(board_id, data)
+                    except Exception as e:
+                        logging.error(f"Board cache error for {board_id}: {e}")
                     await manager.broadcast_to_local(board_id, data)
     except Exception as e:
         logging.error(f"Redis listener error: {e}")
@@ -1,6 +1,10 @@
 from typing import Dict, List
 from fastapi import WebSocket
+from app.core.config import settings
+import asyncio
+import json
 import logging
+import random
 
 class ConnectionManager:
     def __init__(self):
@@ -8,6 +12,10 @@ class ConnectionManager:
         self.active_connections: Dict[str, List[WebSocket]] = {}
         # board_id -> datetime (when it became empty)
         self.empty_since: Dict[str, float] = {}
+        # Bumped whenever a room loses its last socket (lets the cache spot new idle boards)
+        self.rooms_emptied = 0
+        # Set once the node starts shutting down; new joins are redirected
+        self.draining = False
 
     async def connect(self, websocket: WebSocket, board_id: str):
         await websocket.accept()
@@ -28,6 +36,7 @@ class ConnectionManager:
             
             if not self.active_connections[board_id]:
                 del self.active_connections[board_id]
+                self.rooms_emptied += 1
                 # Mark as empty
                 import time
                 self.empty_since[board_id] = time.time()
@@ -46,4 +55,53 @@ class ConnectionManager:
                 except Exception as e:
                     logging.error(f"Error broadcasting: {e}")
 
+    def reconnect_directive(self) -> str:
+        """
+        Tells a client to reconnect after a jittered delay, so a node's sockets
+        do not all come back at the same instant.
+        """
+        return json.dumps({
+            "type": "reconnect",
+            "delay_ms": settings.RECONNECT_BASE_DELAY_MS + random.randint(0, settings.RECONNECT_JITTER_MS),
+            "target": settings.RECONNECT_TARGET or None
+        })
+
+    async def send_reconnect(self, websocket: WebSocket, board_id: str):
+        try:
+            await websocket.send_text(self.reconnect_directive())
+            await websocket.close(code=1012) # Service restart
+        except Exception as e:
+            logging.debug(f"Error sending reconnect directive: {e}")
+        self.disconnect(websocket, board_id)
+
+    async def drain(self):
+        """
+        Gradually closes all local sockets with a reconnect directive,
+        DRAIN_BATCH_SIZE at a time, instead of dropping them all at once.
+        """
+        self.draining = True
+        sockets = [
+            (board_id, websocket)
+            for board_id, connections in list(self.active_connections.items())
+            for websocket in list(connections)
+        ]
+        logging.info(f"Draining {len(sockets)} connections")
+
+        for i in range(0, len(sockets), settings.DRAIN_BATCH_SIZE):
+            # Cancelled via undrain(): keep the remaining clients connected
+            if not self.draining:
+                logging.info(f"Drain cancelled after {i} of {len(sockets)} connections")
+                return
+            batch = sockets[i:i + settings.DRAIN_BATCH_SIZE]
+            await asyncio.gather(*(self.send_reconnect(ws, board_id) for board_id, ws in batch))
+            if i + settings.DRAIN_BATCH_SIZE < len(sockets):
+                await asyncio.sleep(settings.DRAIN_INTERVAL)
+
+    def undrain(self):
+        """
+        Resumes accepting joins, e.g. when a stop that triggered `drain` is cancelled.
+        """
+        self.draining = False
+        logging.info("Drain cancelled, accepting connections again")
+
 manager = ConnectionManager()
@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import math
+import uuid
+from datetime import datetime, timedelta
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from app.db.mongodb import mongodb
+from app.services.socket_manager import manager
+
+# Tunable parameters
+PREVIEW_DEBOUNCE = 5.0      # seconds a board must be quiet before its preview is rebuilt
+PREVIEW_BATCH_SIZE = 20     # previews rebuilt per worker pass
+PREVIEW_WIDTH = 160
+PREVIEW_HEIGHT = 100
+PREVIEW_MAX_OBJECTS = 200   # most recent objects drawn in a preview
+PRESENCE_HEARTBEAT = 10.0   # seconds between refreshes of this node's presence
+PRESENCE_TTL = 30.0         # presence not refreshed for this long is ignored
+
+# Identifies this process in summary presence; a new id per start means a
+# crashed or killed node's counts simply expire instead of lingering
+NODE_ID = uuid.uuid4().hex[:12]
+
+BBOX_FIELDS = ("min_x", "min_y", "max_x", "max_y")
+
+# Summary document (collection `board_summaries`, one per board):
+#   board_id, object_count, min_x/min_y/max_x/max_y (absent when empty),
+#   last_modified, preview_svg, preview_stale,
+#   presence.<node_id> = {count, at} (live sockets per node, expires after PRESENCE_TTL),
+#   version (bumped on every content change, guards background rebuilds)
+
+
+def _summaries():
+    return mongodb.db.board_summaries
+
+
+async def ensure_summary_indexes():
+    await _summaries().create_index("board_id", unique=True)
+    # Listing: newest activity first, board_id as tie-breaker for cursors
+    await _summaries().create_index(
+        [("last_modified", DESCENDING), ("board_id", DESCENDING)],
+        name="last_activity"
+    )
+    await _summaries().create_index(
+        [("last_modified", ASCENDING)],
+        name="stale_previews",
+        partialFilterExpression={"preview_stale": True}
+    )
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def object_bounds(obj) -> Optional[Tuple[float, float, float, float]]:
+    """
+    Axis-aligned bounds of a Fabric.js object (rotation is ignored).
+    """
+    if not isinstance(obj, dict):
+        return None
+    left, top = obj.get("left"), obj.get("top")
+    if not _is_number(left) or not _is_number(top):
+        return None
+
+    width, height = obj.get("width") or 0, obj.get("height") or 0
+    scale_x, scale_y = obj.get("scaleX") or 1, obj.get("scaleY") or 1
+    if not all(_is_number(v) for v in (width, height, scale_x, scale_y)):
+        return None
+
+    width = width * abs(scale_x)
+    height = height * abs(scale_y)
+
+    if obj.get("originX") == "center":
+        left -= width / 2
+    elif obj.get("originX") == "right":
+        left -= width
+    if obj.get("originY") == "center":
+        top -= height / 2
+    elif obj.get("originY") == "bottom":
+        top -= height
+
+    return (left, top, left + width, top + height)
+
+
+def _merge_bounds(bounds: List[tuple]) -> Optional[dict]:
+    if not bounds:
+        return None
+    return {
+        "min_x": min(b[0] for b in bounds),
+        "min_y": min(b[1] for b in bounds),
+        "max_x": max(b[2] for b in bounds),
+        "max_y": max(b[3] for b in bounds),
+    }
+
+
+def render_preview(snapshot: List[dict], bbox: Optional[dict]) -> str:
+    """
+    Low-resolution SVG of a board: each object drawn as its outline shape,
+    scaled into a PREVIEW_WIDTH x PREVIEW_HEIGHT viewBox.
+    """
+    header = f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {PREVIEW_WIDTH} {PREVIEW_HEIGHT}">'
+    if not bbox:
+        return header + "</svg>"
+
+    span_x = max(bbox["max_x"] - bbox["min_x"], 1)
+    span_y = max(bbox["max_y"] - bbox["min_y"], 1)
+    scale = min(PREVIEW_WIDTH / span_x, PREVIEW_HEIGHT / span_y)
+
+    parts = [header]
+    for obj in snapshot[-PREVIEW_MAX_OBJECTS:]:
+        b = object_bounds(obj)
+        if not b:
+            continue
+        x1 = round((b[0] - bbox["min_x"]) * scale, 1)
+        y1 = round((b[1] - bbox["min_y"]) * scale, 1)
+        x2 = round((b[2] - bbox["min_x"]) * scale, 1)
+        y2 = round((b[3] - bbox["min_y"]) * scale, 1)
+
+        color = obj.get("stroke")
+        if not color or color == "null":
+            color = obj.get("fill") or "#888888"
+        color = escape(str(color), quote=True)
+
+        kind = obj.get("type")
+        if kind in ("circle", "ellipse"):
+            parts.append(
+                f'<ellipse cx="{(x1 + x2) / 2:.1f}" cy="{(y1 + y2) / 2:.1f}" '
+                f'rx="{(x2 - x1) / 2:.1f}" ry="{(y2 - y1) / 2:.1f}" fill="none" stroke="{color}"/>'
+            )
+        elif kind == "line":
+            parts.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="{color}"/>')
+        else:
+            parts.append(
+                f'<rect x="{x1}" y="{y1}" width="{round(x2 - x1, 1)}" height="{round(y2 - y1, 1)}" '
+                f'fill="none" stroke="{color}"/>'
+            )
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _live_participants(doc: dict) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=PRESENCE_TTL)
+    return sum(
+        p.get("count", 0)
+        for p in (doc.get("presence") or {}).values()
+        if isinstance(p, dict) and p.get("at") and p["at"] >= cutoff
+    )
+
+
+def _presence_entry(board_id: str) -> dict:
+    return {"count": len(manager.active_connections.get(board_id, [])), "at": datetime.utcnow()}
+
+
+def to_summary(doc: dict) -> dict:
+    """
+    Shapes a stored summary document for the API (see `BoardSummary`).
+    """
+    bbox = None
+    if all(f in doc for f in BBOX_FIELDS):
+        bbox = {f: doc[f] for f in BBOX_FIELDS}
+    return {
+        "board_id": doc["board_id"],
+        "object_count": max(doc.get("object_count", 0), 0),
+        "bbox": bbox,
+        "last_modified": doc.get("last_modified"),
+        "participant_count": _live_participants(doc),
+        "preview_svg": doc.get("preview_svg"),
+    }
+
+
+async def init_summary(board_id: str, created_at: Optional[datetime] = None):
+    await _summaries().update_one(
+        {"board_id": board_id},
+        {"$setOnInsert": {
+            "object_count": 0,
+            "last_modified": created_at or datetime.utcnow(),
+            "preview_svg": render_preview([], None),
+            "preview_stale": False,
+            "version": 0,
+        }},
+        upsert=True
+    )
+
+
+async def mark_stale(activity: Dict[str, Optional[datetime]]):
+    """
+    Flags summaries for a full rebuild (e.g. after a bulk import).
+
+    `activity` maps board_id to the board's known last activity time, which
+    is kept as `last_modified` so imports don't reorder listings.
+    """
+    if not activity:
+        return
+    bulk_ops = []
+    for board_id, last_modified in activity.items():
+        update = {
+            "$set": {"preview_stale": True},
+            "$inc": {"version": 1},
+            "$setOnInsert": {"object_count": 0},
+        }
+        if last_modified:
+            update["$set"]["last_modified"] = last_modified
+        else:
+            update["$setOnInsert"]["last_modified"] = datetime.utcnow()
+        bulk_ops.append(UpdateOne({"board_id": board_id}, update, upsert=True))
+    await _summaries().bulk_write(bulk_ops, ordered=False)
+
+
+async def delete_summary(board_id: str):
+    await _summaries().delete_one({"board_id": board_id})
+
+
+async def apply_events_to_summary(board_id: str, events: list):
+    """
+    Incrementally folds a batch of events into the board summary.
+
+    Counts and bounds are maintained cheaply here (bounds only grow); the
+    background preview worker later recomputes them exactly from the snapshot.
+    Must run before the snapshot write so a concurrent rebuild never counts
+    an event twice (the version bump invalidates it).
+    """
+    count_delta = 0
+    presence_changed = False
+    cleared = False
+    touched = False
+    bounds = []
+
+    for msg in events:
+        t = msg["type"]
+        data = msg.get("data")
+
+        if t == "presence":
+            presence_changed = True
+            continue
+
+        touched = True
+        if t == "board:clear":
+            cleared = True
+            count_delta = 0
+            bounds = []
+        elif t == "object:added":
+            count_delta += 1
+            b = object_bounds(data)
+            if b:
+                bounds.append(b)
+        elif t == "object:modified":
+            b = object_bounds(data)
+            if b:
+                bounds.append(b)
+        elif t == "object:removed":
+            count_delta -= 1
+
+    update = {}
+    if presence_changed:
+        # Absolute local count, not a delta, so it cannot drift
+        entry = _presence_entry(board_id)
+        if entry["count"]:
+            update["$set"] = {f"presence.{NODE_ID}": entry}
+        else:
+            update["$unset"] = {f"presence.{NODE_ID}": ""}
+
+    if touched:
+        update["$inc"] = {"version": 1}
+        update.setdefault("$set", {}).update({"last_modified": datetime.utcnow(), "preview_stale": True})
+        merged = _merge_bounds(bounds)
+
+        if cleared:
+            update["$set"]["object_count"] = max(count_delta, 0)
+            if merged:
+                update["$set"].update(merged)
+            else:
+                update.setdefault("$unset", {}).update({f: "" for f in BBOX_FIELDS})
+        else:
+            if count_delta:
+                update["$inc"]["object_count"] = count_delta
+            if merged:
+                update["$min"] = {"min_x": merged["min_x"], "min_y": merged["min_y"]}
+                update["$max"] = {"max_x": merged["max_x"], "max_y": merged["max_y"]}
+
+    if not update:
+        return
+
+    # A board that predates summaries gets one here, stamped with this edit and
+    # marked stale, so the preview worker rebuilds it after the snapshot write
+    await _summaries().update_one({"board_id": board_id}, update, upsert=touched)
+
+
+async def rebuild_summary(board_id: str, expected_version: Optional[int] = None):
+    """
+    Recomputes a summary and its preview from the board snapshot.
+
+    With `expected_version`, the result is only written if no event has been
+    folded in since; otherwise the board stays stale and is retried later.
+    """
+    board = await mongodb.db.boards.find_one(
+        {"board_id": board_id},
+        {"snapshot": 1, "created_at": 1}
+    )
+    if not board:
+        await delete_summary(board_id)
+        return
+
+    snapshot = board.get("snapshot") or []
+    bbox = _merge_bounds([b for b in map(object_bounds, snapshot) if b])
+
+    # Drop presence left behind by nodes that stopped refreshing it
+    summary = await _summaries().find_one({"board_id": board_id}, {"presence": 1}) or {}
+    cutoff = datetime.utcnow() - timedelta(seconds=PRESENCE_TTL)
+    expired = [
+        f"presence.{node_id}"
+        for node_id, p in (summary.get("presence") or {}).items()
+        if not isinstance(p, dict) or not p.get("at") or p["at"] < cutoff
+    ]
+
+    fields = {
+        "object_count": len(snapshot),
+        "preview_svg": render_preview(snapshot, bbox),
+        "preview_stale": False,
+    }
+    update = {"$set": fields}
+    unset = {f: "" for f in expired}
+    if bbox:
+        fields.update(bbox)
+    else:
+        unset.update({f: "" for f in BBOX_FIELDS})
+    if unset:
+        update["$unset"] = unset
+
+    if expected_version is None:
+        update["$setOnInsert"] = {
+            "last_modified": board.get("created_at") or datetime.utcnow(),
+            "version": 0,
+        }
+        await _summaries().update_one({"board_id": board_id}, update, upsert=True)
+    else:
+        await _summaries().update_one(
+            {"board_id": board_id, "version": expected_version},
+            update
+        )
+
+
+async def rebuild_all_summaries() -> int:
+    """
+    Backfills summaries for every board (one snapshot in memory at a time).
+    """
+    count = 0
+    async for doc in mongodb.db.boards.find({}, {"board_id": 1}):
+        await rebuild_summary(doc["board_id"])
+        count += 1
+    return count
+
+
+async def presence_heartbeat_worker():
+    """
+    Background worker that refreshes this node's presence on every board it
+    has sockets for, keeping it inside PRESENCE_TTL.
+    """
+    while True:
+        try:
+            await asyncio.sleep(PRESENCE_HEARTBEAT)
+
+            bulk_ops = [
+                UpdateOne({"board_id": board_id}, {"$set": {f"presence.{NODE_ID}": _presence_entry(board_id)}})
+                for board_id in list(manager.active_connections)
+            ]
+            if bulk_ops:
+                await _summaries().bulk_write(bulk_ops, ordered=False)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Error in presence heartbeat worker: {e}")
+
+
+async def summary_preview_worker():
+    """
+    Background worker that rebuilds previews of boards that have been quiet
+    for PREVIEW_DEBOUNCE seconds, so busy boards are not re-rendered per event.
+    """
+    while True:
+        try:
+            await asyncio.sleep(PREVIEW_DEBOUNCE)
+
+            cutoff = datetime.utcnow() - timedelta(seconds=PREVIEW_DEBOUNCE)
+            cursor = _summaries().find(
+                {"preview_stale": True, "last_modified": {"$lte": cutoff}},
+                {"board_id": 1, "version": 1}
+            ).limit(PREVIEW_BATCH_SIZE)
+
+            async for doc in cursor:
+                # One bad board must not stall previews for every other board
+                try:
+                    await rebuild_summary(doc["board_id"], doc.get("version", 0))
+                except Exception as e:
+                    logging.error(f"Error rebuilding summary for {doc['board_id']}: {e}")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Error in summary preview worker: {e}")